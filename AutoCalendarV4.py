@@ -1,13 +1,21 @@
 import re
 import datetime
-import uuid
+import functools
+import os
 from zoneinfo import ZoneInfo  # Requires Python 3.9+
 
 # ---------------------------
 # Course Parsing Section
 # ---------------------------
 
+# Splits space-aligned meeting info on runs of two or more whitespace characters.
+_WS_SPLIT = re.compile(r'\s{2,}')
+# Course blocks are separated by blank lines, which may contain stray whitespace.
+_BLOCK_SPLIT = re.compile(r'\n\s*\n')
+
 class Course:
+    __slots__ = ("className", "instructor", "meetingType", "time", "days", "location", "dateRange")
+
     def __init__(self, className, instructor, meetingType, time, days, location, dateRange):
         self.className = className
         self.instructor = instructor if instructor else "TBA"
@@ -18,6 +26,12 @@ class Course:
         self.dateRange = dateRange
 
     def __repr__(self):
+        return f"Course({self.className!r})"
+
+    def pretty(self):
+        """
+        Returns a multi-line summary of every field, for debugging output.
+        """
         return (f"\nCourse Information:\n"
                 f"  Class Name  : {self.className}\n"
                 f"  Instructor  : {self.instructor}\n"
@@ -29,27 +43,34 @@ class Course:
 
 def parseCourses(text):
     courses = []
-    blocks = text.strip().split("\n\n")
+    # Blocks without a meeting table come out all-TBA and are dropped by
+    # generateICS anyway, so skip them (or the whole input) before splitting lines.
+    if "Scheduled Meeting Times" not in text:
+        return courses
+    blocks = _BLOCK_SPLIT.split(text.strip())
 
     for block in blocks:
+        if "Scheduled Meeting Times" not in block:
+            continue
         lines = block.strip().splitlines()
         if not lines:
             continue
 
-        className = lines[0].strip()
+        # block.strip() already removed the leading whitespace of the first line.
+        className = lines[0].rstrip()
         instructor = None
         meetingInfoLine = None
         headerLine = None
+        scheduledIndex = None
 
-        for line in lines:
-            if "Assigned Instructor:" in line:
+        # Walk the block once, picking up the instructor and the meeting table together.
+        for i, line in enumerate(lines):
+            if instructor is None and "Assigned Instructor:" in line:
                 parts = line.split("Assigned Instructor:")
                 instructor = parts[1].strip() if len(parts) > 1 else "TBA"
-
-        scheduledIndex = None
-        for i, line in enumerate(lines):
-            if "Scheduled Meeting Times" in line:
+            elif scheduledIndex is None and "Scheduled Meeting Times" in line:
                 scheduledIndex = i
+            if instructor is not None and scheduledIndex is not None:
                 break
 
         if scheduledIndex is not None:
@@ -71,7 +92,7 @@ def parseCourses(text):
                     dateRange = data[headers.index("Date Range")].strip()
                     meetingType = data[headers.index("Schedule Type")].strip().lower()
                 except ValueError:
-                    parts = re.split(r'\s{2,}', meetingInfoLine)
+                    parts = _WS_SPLIT.split(meetingInfoLine)
                     if len(parts) >= 7:
                         timeVal = parts[1].strip()
                         days = parts[2].strip()
@@ -79,7 +100,7 @@ def parseCourses(text):
                         dateRange = parts[4].strip()
                         meetingType = parts[5].strip().lower()
             else:
-                parts = re.split(r'\s{2,}', meetingInfoLine)
+                parts = _WS_SPLIT.split(meetingInfoLine)
                 if len(parts) >= 7:
                     timeVal = parts[1].strip()
                     days = parts[2].strip()
@@ -96,6 +117,24 @@ def parseCourses(text):
 # Helper Functions for ICS Conversion
 # ---------------------------
 
+class _DayTable(dict):
+    """
+    Translation table for parseDays. Characters that are not day letters are
+    looked up through __missing__ and deleted, matching the old skip behaviour.
+    """
+    def __missing__(self, key):
+        return None
+
+_DAY_TABLE = _DayTable(str.maketrans({
+    'M': 'MO,',
+    'T': 'TU,',
+    'W': 'WE,',
+    'R': 'TH,',  # R for Thursday
+    'F': 'FR,',
+    'S': 'SA,',  # S for Saturday (assumed)
+    'U': 'SU,'
+}))
+
 def parseDays(daysStr):
     """
     Converts a days string (each day as a single letter) into a list of ICS BYDAY values.
@@ -103,38 +142,51 @@ def parseDays(daysStr):
       M -> MO, T -> TU, W -> WE, R -> TH, F -> FR, S -> SA, U -> SU
     Example: "MW" becomes ["MO", "WE"]
     """
-    mapping = {
-        'M': 'MO',
-        'T': 'TU',
-        'W': 'WE',
-        'R': 'TH',  # R for Thursday
-        'F': 'FR',
-        'S': 'SA',  # S for Saturday (assumed)
-        'U': 'SU'
-    }
-    result = []
-    for ch in daysStr.strip().upper():
-        if ch in mapping:
-            result.append(mapping[ch])
-    return result
+    codes = daysStr.strip().upper().translate(_DAY_TABLE)
+    return codes.rstrip(',').split(',') if codes else []
+
+_MONTHS = {name: i for i, name in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)}
+
+def parseDate(dateStr):
+    """
+    Parses a single date in either "MM/DD/YYYY" or "Mon DD, YYYY" form.
+    The form is picked from the first character, so no failed parse is needed
+    to find the right one. As with strptime, the day may be padded with one
+    space ("01/ 6/2025"); unlike it, full month names and a missing comma are
+    also accepted. Raises ValueError on any bad input, including a year that
+    is not exactly four digits.
+    """
+    if dateStr[:1].isdigit():
+        month, day, year = dateStr.split("/")
+        if not (len(month) <= 2 and month.isdigit()):
+            raise ValueError(f"Unrecognized date: {dateStr!r}")
+        month = int(month)
+        if len(day) == 2 and day[0] == " ":
+            day = day[1]
+    else:
+        monthName, day, year = dateStr.replace(",", " ").split()
+        month = _MONTHS.get(monthName[:3].lower())
+        if month is None:
+            raise ValueError(f"Unrecognized month: {dateStr!r}")
+    # Only plain digits and a four-digit year, as strptime("%d") and ("%Y") required.
+    if not (len(day) <= 2 and day.isdigit() and len(year) == 4 and year.isdigit()):
+        raise ValueError(f"Unrecognized date: {dateStr!r}")
+    return datetime.date(int(year), month, int(day))
 
 def parseDateRange(dateRangeStr):
     """
     Expects a date range in one of the following formats:
       "MM/DD/YYYY - MM/DD/YYYY"
       "Mon DD, YYYY - Mon DD, YYYY" (e.g., "Jan 06, 2025 - Apr 08, 2025")
+    Both ends must use the same format.
     Returns a tuple (startDate, endDate) as datetime.date objects.
     """
     try:
         startStr, endStr = [s.strip() for s in dateRangeStr.split("-")]
-        for fmt in ("%m/%d/%Y", "%b %d, %Y"):
-            try:
-                startDate = datetime.datetime.strptime(startStr, fmt).date()
-                endDate = datetime.datetime.strptime(endStr, fmt).date()
-                return startDate, endDate
-            except ValueError:
-                continue
-        return None, None
+        if startStr[:1].isdigit() != endStr[:1].isdigit():
+            return None, None
+        return parseDate(startStr), parseDate(endStr)
     except Exception:
         return None, None
 
@@ -147,27 +199,37 @@ def parseTimeRange(timeStr, eventDate, tz):
     try:
         # Ensure AM/PM parts are uppercase
         startTimeStr, endTimeStr = [s.strip().upper() for s in timeStr.split("-")]
-        startDT = datetime.datetime.strptime(f"{eventDate.strftime('%m/%d/%Y')} {startTimeStr}", "%m/%d/%Y %I:%M %p")
-        endDT = datetime.datetime.strptime(f"{eventDate.strftime('%m/%d/%Y')} {endTimeStr}", "%m/%d/%Y %I:%M %p")
-        startDT = startDT.replace(tzinfo=tz)
-        endDT = endDT.replace(tzinfo=tz)
+        # Parse only the clock times and attach them to eventDate directly.
+        startT = datetime.datetime.strptime(startTimeStr, "%I:%M %p").time()
+        endT = datetime.datetime.strptime(endTimeStr, "%I:%M %p").time()
+        startDT = datetime.datetime.combine(eventDate, startT, tzinfo=tz)
+        endDT = datetime.datetime.combine(eventDate, endT, tzinfo=tz)
         return startDT, endDT
     except Exception:
         return None, None
 
+_WD_BITS = {'MO': 1, 'TU': 2, 'WE': 4, 'TH': 8, 'FR': 16, 'SA': 32, 'SU': 64}
+
+def _firstOffset(mask, weekday):
+    for i in range(7):
+        if mask & (1 << ((weekday + i) % 7)):
+            return datetime.timedelta(days=i)
+    return datetime.timedelta(0)
+
+# _FIRST_OFFSET[mask][weekday] is the timedelta from a date on that weekday
+# to the first meeting day in mask (zero when mask is empty).
+_FIRST_OFFSET = tuple(tuple(_firstOffset(mask, wd) for wd in range(7)) for mask in range(128))
+
 def getFirstOccurrence(startDate, bydayList):
     """
     Given a starting date and a list of ICS BYDAY values,
     returns the first date on or after startDate that matches one of the weekdays.
     """
-    weekdayMapping = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
-    targetWeekdays = [weekdayMapping[day] for day in bydayList if day in weekdayMapping]
-    current = startDate
-    for _ in range(7):
-        if current.weekday() in targetWeekdays:
-            return current
-        current += datetime.timedelta(days=1)
-    return startDate
+    # Bit n of mask is set when weekday n (Monday == 0) is a meeting day.
+    mask = 0
+    for day in bydayList:
+        mask |= _WD_BITS.get(day, 0)
+    return startDate + _FIRST_OFFSET[mask][startDate.weekday()]
 
 def formatDateTime(dt):
     """
@@ -175,12 +237,22 @@ def formatDateTime(dt):
     """
     return dt.strftime("%Y%m%dT%H%M%S")
 
+_ICS_ESCAPE = str.maketrans({'\\': '\\\\', ';': '\\;', ',': '\\,', '\n': '\\n', '\r': ''})
+
+def escapeText(text):
+    """
+    Escapes a value for an ICS TEXT property (RFC 5545 section 3.3.11):
+    backslash, semicolon, comma and newline are backslash-escaped.
+    """
+    return text.translate(_ICS_ESCAPE)
+
+@functools.lru_cache(maxsize=8)
 def generateVTimezone(tzid):
     """
     Returns a VTIMEZONE block for the given tzid.
     This example uses America/New_York definitions.
     """
-    return "\n".join([
+    return "\r\n".join([
         "BEGIN:VTIMEZONE",
         f"TZID:{tzid}",
         "X-LIC-LOCATION:America/New_York",
@@ -205,67 +277,100 @@ def generateVTimezone(tzid):
 # ICS Generation Section
 # ---------------------------
 
-def generateICS(courses, calendarName="Courses Calendar"):
+# Timezone data and the VTIMEZONE block never change, so build them once per process.
+_TZID = "America/New_York"
+_NYTZ = ZoneInfo(_TZID)
+_VTIMEZONE_BLOCK = generateVTimezone(_TZID)
+
+def buildSchedule(timeStr, daysStr, dateRange, tz):
     """
-    Converts a list of Course objects into an ICS file content.
-    Each course becomes a repeating event.
+    Works out the recurrence for one meeting schedule.
+    Returns a tuple (dtStart, dtEnd, rrule) of ICS-formatted strings,
+    or None when the schedule is missing or cannot be parsed.
+    """
+    # Skip courses missing required scheduling info.
+    if dateRange == "TBA" or timeStr == "TBA" or daysStr == "TBA":
+        return None
+
+    startDate, endDate = parseDateRange(dateRange)
+    if not startDate or not endDate:
+        return None
+
+    # Parse meeting days (each letter represents a day).
+    bydayList = parseDays(daysStr)
+    if not bydayList:
+        return None
+
+    # Determine the first occurrence on or after the start date.
+    firstOccurrenceDate = getFirstOccurrence(startDate, bydayList)
+    startDT, endDT = parseTimeRange(timeStr, firstOccurrenceDate, tz)
+    if not startDT or not endDT:
+        return None
+
+    # Build the RRULE string.
+    # Use the course end date with the event's start time for the UNTIL value.
+    untilDT = datetime.datetime.combine(endDate, startDT.timetz())
+    untilDT = untilDT.replace(tzinfo=tz)
+    rrule = f"FREQ=WEEKLY;UNTIL={formatDateTime(untilDT)};BYDAY={','.join(bydayList)}"
+    return formatDateTime(startDT), formatDateTime(endDT), rrule
+
+def iterICS(courses, calendarName="Courses Calendar"):
     """
-    tzid = "America/New_York"
-    nytz = ZoneInfo(tzid)
-    
-    lines = []
-    lines.append("BEGIN:VCALENDAR")
-    lines.append("VERSION:2.0")
-    lines.append("PRODID:-//Course ICS Converter//EN")
-    lines.append(f"X-WR-CALNAME:{calendarName}")
-    # Insert VTIMEZONE block for the timezone
-    lines.append(generateVTimezone(tzid))
-    
-    now = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
-    dtStamp = formatDateTime(now.astimezone(nytz))
-
-    for course in courses:
-        # Skip courses missing required scheduling info.
-        if course.dateRange == "TBA" or course.time == "TBA" or course.days == "TBA":
+    Yields the ICS file content for a list of Course objects in chunks:
+    the calendar header, then one chunk per VEVENT, then the footer.
+    Every chunk ends with CRLF, so joining them gives the full file.
+    """
+    tzid = _TZID
+    nytz = _NYTZ
+
+    # Header plus the VTIMEZONE block for the timezone
+    yield (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Course ICS Converter//EN\r\n"
+        f"X-WR-CALNAME:{escapeText(calendarName)}\r\n{_VTIMEZONE_BLOCK}\r\n"
+    )
+
+    # RFC 5545 requires DTSTAMP in UTC form (trailing "Z").
+    dtStamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    # Read the entropy for every UID in one call and slice 16 bytes per course.
+    rand = os.urandom(16 * len(courses))
+
+    # Many sections share a meeting time, days and term, so each distinct
+    # schedule is parsed once; None marks schedules that cannot be used.
+    schedules = {}
+
+    for i, course in enumerate(courses):
+        key = (course.time, course.days, course.dateRange)
+        if key in schedules:
+            schedule = schedules[key]
+        else:
+            schedule = schedules[key] = buildSchedule(*key, nytz)
+        if schedule is None:
             continue
+        dtStart, dtEnd, rrule = schedule
 
-        startDate, endDate = parseDateRange(course.dateRange)
-        if not startDate or not endDate:
-            continue
+        uid = rand[i * 16:(i + 1) * 16].hex() + "@coursecalendar"
+        className, location = escapeText(course.className), escapeText(course.location)
+        description = (f"Type: {escapeText(course.meetingType.capitalize())}"
+                       f"\\nInstructor: {escapeText(course.instructor)}")
 
-        # Parse meeting days (each letter represents a day).
-        bydayList = parseDays(course.days)
-        if not bydayList:
-            continue
+        # Build the whole VEVENT in one interpolation; RFC 5545 requires CRLF line endings.
+        yield (
+            f"BEGIN:VEVENT\r\nUID:{uid}\r\nDTSTAMP:{dtStamp}\r\n"
+            f"DTSTART;TZID={tzid}:{dtStart}\r\n"
+            f"DTEND;TZID={tzid}:{dtEnd}\r\n"
+            f"RRULE:{rrule}\r\nSUMMARY:{className}\r\n"
+            f"DESCRIPTION:{description}\r\nLOCATION:{location}\r\nEND:VEVENT\r\n"
+        )
 
-        # Determine the first occurrence on or after the start date.
-        firstOccurrenceDate = getFirstOccurrence(startDate, bydayList)
-        startDT, endDT = parseTimeRange(course.time, firstOccurrenceDate, nytz)
-        if not startDT or not endDT:
-            continue
+    yield "END:VCALENDAR\r\n"
 
-        # Build the RRULE string.
-        # Use the course end date with the event's start time for the UNTIL value.
-        untilDT = datetime.datetime.combine(endDate, startDT.timetz())
-        untilDT = untilDT.replace(tzinfo=nytz)
-        rrule = f"FREQ=WEEKLY;UNTIL={formatDateTime(untilDT)};BYDAY={','.join(bydayList)}"
-
-        uid = f"{uuid.uuid4()}@coursecalendar"
-        description = f"Type: {course.meetingType.capitalize()}\\nInstructor: {course.instructor}"
-
-        lines.append("BEGIN:VEVENT")
-        lines.append(f"UID:{uid}")
-        lines.append(f"DTSTAMP:{dtStamp}")
-        lines.append(f"DTSTART;TZID={tzid}:{formatDateTime(startDT)}")
-        lines.append(f"DTEND;TZID={tzid}:{formatDateTime(endDT)}")
-        lines.append(f"RRULE:{rrule}")
-        lines.append(f"SUMMARY:{course.className}")
-        lines.append(f"DESCRIPTION:{description}")
-        lines.append(f"LOCATION:{course.location}")
-        lines.append("END:VEVENT")
-    
-    lines.append("END:VCALENDAR")
-    return "\n".join(lines)
+def generateICS(courses, calendarName="Courses Calendar"):
+    """
+    Converts a list of Course objects into an ICS file content.
+    Each course becomes a repeating event.
+    """
+    return "".join(iterICS(courses, calendarName))
 
 # ---------------------------
 # Main Execution Section
@@ -281,14 +386,14 @@ if __name__ == "__main__":
 
     # Uncomment below for debugging:
     # for course in parsedCourses:
-    #     print(course)
+    #     print(course.pretty())
 
     # Generate the ICS file content
     icsContent = generateICS(parsedCourses)
 
     # Write the ICS content to a file
     icsFilePath = "courses.ics"
-    with open(icsFilePath, "w", encoding="utf-8") as icsFile:
+    with open(icsFilePath, "w", encoding="utf-8", newline="") as icsFile:
         icsFile.write(icsContent)
 
     print(f"ICS file has been generated and saved to {icsFilePath}.")
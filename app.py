@@ -1,8 +1,15 @@
-from flask import Flask, request, make_response, render_template_string
+from flask import Flask, Response, request
+from flask_compress import Compress
 from flask_sqlalchemy import SQLAlchemy
+import atexit
 import os
+import queue
 import re
-from AutoCalendarV4 import parseCourses, generateICS
+import threading
+import time
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from AutoCalendarV4 import parseCourses, iterICS
 
 app = Flask(__name__)
 
@@ -15,6 +22,20 @@ if not DATABASE_URL:
 # Fix potential "postgres://" bug (Railway uses "postgres://", but SQLAlchemy expects "postgresql://")
 app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URL.replace("postgres://", "postgresql://")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# Keep connections open between requests instead of reconnecting to Postgres each time
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+    "pool_size": 10,
+    "max_overflow": 20,
+    "pool_pre_ping": True,
+    "pool_recycle": 1800,
+}
+
+# Compress ICS downloads; the repeated property names shrink very well.
+# The download is streamed, so it goes through the streaming algorithm list,
+# which leaves out gzip by default; add it for gzip-only clients.
+app.config["COMPRESS_MIMETYPES"] = ["text/calendar"]
+app.config["COMPRESS_ALGORITHM_STREAMING"] = ["zstd", "br", "gzip", "deflate"]
+Compress(app)
 
 # Initialize the database
 db = SQLAlchemy(app)
@@ -32,6 +53,97 @@ class UserEmail(db.Model):
 def create_tables():
     db.create_all()
 
+# Emails are queued by the request handler and written in batches by a
+# background writer, so the handler does not wait on the database. Under the
+# gevent worker the writer is a greenlet; gunicorn.conf.py patches psycopg2 so
+# its queries yield to request handlers instead of blocking them.
+# Emails still in the queue are lost if the process is killed outright (e.g.
+# SIGKILL); only a normal shutdown flushes them.
+EMAIL_BATCH_SIZE = 100
+EMAIL_FLUSH_INTERVAL = 2  # seconds to wait for more emails before committing
+_email_queue = queue.Queue()
+
+def insert_ignoring_duplicates():
+    # INSERT that skips addresses already stored (the column is unique),
+    # or None when the backend has no such construct
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(UserEmail).on_conflict_do_nothing(index_elements=["email"])
+    if dialect == "sqlite":
+        return sqlite.insert(UserEmail).on_conflict_do_nothing(index_elements=["email"])
+    if dialect in ("mysql", "mariadb"):
+        return insert(UserEmail).prefix_with("IGNORE")
+    return None
+
+def save_emails(batch):
+    # One executemany INSERT and one COMMIT per batch
+    emails = set(batch)
+    stmt = insert_ignoring_duplicates()
+    if stmt is None:
+        # Other backends: leave out addresses that are already stored first
+        existing = {row.email for row in UserEmail.query.filter(UserEmail.email.in_(emails))}
+        emails -= existing
+        stmt = insert(UserEmail)
+    if emails:
+        db.session.execute(stmt, [{"email": email} for email in emails])
+        db.session.commit()
+
+def email_writer():
+    stopping = False
+    while not stopping:
+        # Block for the first email, then keep collecting until the batch is
+        # full or the flush interval has passed
+        batch = [_email_queue.get()]
+        deadline = time.monotonic() + EMAIL_FLUSH_INTERVAL
+        while len(batch) < EMAIL_BATCH_SIZE and batch[-1] is not None:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(_email_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        if None in batch:
+            stopping = True
+            batch = [email for email in batch if email is not None]
+        if not batch:
+            continue
+        with app.app_context():
+            try:
+                save_emails(batch)
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Failed to save %d email(s), retrying one at a time", len(batch))
+                # Retry each address on its own so one bad row does not drop the rest
+                for email in set(batch):
+                    try:
+                        save_emails([email])
+                    except Exception:
+                        db.session.rollback()
+                        app.logger.exception("Failed to save email %s", email)
+
+_email_thread = None
+_email_thread_lock = threading.Lock()
+
+def queue_email(email):
+    # The writer is started on first use rather than at import, so with
+    # gunicorn --preload it runs in each worker instead of only the master
+    # (threads do not survive fork, so is_alive() is False in a new worker)
+    global _email_thread
+    if _email_thread is None or not _email_thread.is_alive():
+        with _email_thread_lock:
+            if _email_thread is None or not _email_thread.is_alive():
+                _email_thread = threading.Thread(target=email_writer, name="email-writer", daemon=True)
+                _email_thread.start()
+    _email_queue.put(email)
+
+# Flush any queued emails before the process exits
+@atexit.register
+def stop_email_writer():
+    if _email_thread is not None and _email_thread.is_alive():
+        _email_queue.put(None)
+        _email_thread.join(timeout=10)
+
 
 # HTML template with Tailwind CSS styling, instructions for Outlook, thank-you box, and email input.
 form_template = """
@@ -113,8 +225,12 @@ form_template = """
 </html>
 """
 
+# Compile the template once with Flask's Jinja environment (keeps autoescaping)
+_FORM_TMPL = app.jinja_env.from_string(form_template)
+
 # Email regex validation
 EMAIL_REGEX = r'^[\w\.-]+@[\w\.-]+\.\w+$'
+_EMAIL_RE = re.compile(EMAIL_REGEX)
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
@@ -123,24 +239,22 @@ def index():
         input_text = request.form.get('course_data', '').replace("\r\n", "\n").strip()
 
         # Validate email
-        if not re.match(EMAIL_REGEX, user_email):
-            return render_template_string(form_template, error="Please enter a valid email address.")
+        if not _EMAIL_RE.match(user_email):
+            return _FORM_TMPL.render(error="Please enter a valid email address.")
 
-        # Save to the database
-        new_email = UserEmail(email=user_email)
-        db.session.add(new_email)
-        db.session.commit()
+        # Queue the email to be saved to the database
+        queue_email(user_email)
 
-        # Parse courses and generate ICS file
+        # Parse courses and stream the ICS file back one event at a time
         parsedCourses = parseCourses(input_text)
-        icsContent = generateICS(parsedCourses)
 
-        response = make_response(icsContent)
-        response.headers["Content-Disposition"] = "attachment; filename=courses.ics"
-        response.headers["Content-Type"] = "text/calendar"
-        return response
+        return Response(
+            iterICS(parsedCourses),
+            mimetype="text/calendar",
+            headers={"Content-Disposition": "attachment; filename=courses.ics"},
+        )
 
-    return render_template_string(form_template)
+    return _FORM_TMPL.render()
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
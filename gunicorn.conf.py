@@ -0,0 +1,11 @@
+# gunicorn loads this file automatically from the working directory.
+import os
+
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
+
+def post_fork(server, worker):
+    # psycopg2 does its socket I/O in C, so under the gevent worker every
+    # query would block the whole process. psycogreen makes it yield to the
+    # event loop while waiting on Postgres.
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()